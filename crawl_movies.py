@@ -1,15 +1,25 @@
 #!/usr/bin/env python3
 
 import os
+import argparse
+import re
 import time
-import json
+import asyncio
+import hashlib
 import logging
-import requests
+import orjson
+import msgspec
+import httpx
 from urllib.parse import quote
 from datetime import datetime
-from typing import Dict, Any, Union
+from typing import Callable, Dict, Any, List, Optional, Tuple, Union
 import unicodedata
-from upstash_redis import Redis
+from upstash_redis.asyncio import Redis
+
+try:
+    import uvloop # Faster event loop, only available on Linux/macOS
+except ImportError:
+    uvloop = None
 
 # --- Logging Configuration ---
 logging.basicConfig(
@@ -19,9 +29,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Tắt hoặc giới hạn log của thư viện requests và urllib3
-logging.getLogger("requests").setLevel(logging.WARNING)
-logging.getLogger("urllib3").setLevel(logging.WARNING)
+# Tắt hoặc giới hạn log của thư viện httpx và httpcore
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logging.getLogger("httpcore").setLevel(logging.WARNING)
 
 # --- Environment Variables ---
 UPSTASH_REDIS_REST_URL = os.getenv("UPSTASH_REDIS_REST_URL")
@@ -37,11 +47,66 @@ USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrom
 # --- Redis Cache Configuration ---
 # Match the cache key prefix from api/movie.js
 MOVIE_DETAIL_CACHE_PREFIX = "movie:" 
+# Digest of each cached movie, stored alongside it so unchanged movies are detected without downloading them
+MOVIE_DIGEST_CACHE_PREFIX = "movie_digest:"
+DIGEST_SIZE = 16 # Bytes of BLAKE2b digest
+# KEYS are (digest key, movie key) pairs. Returns a flat (digest, movie) list where the movie is only
+# read when its digest is missing, and "" stands for a missing value. A digest whose movie no longer
+# exists counts as missing, so the movie is cached again instead of being skipped.
+READ_DIGESTS_SCRIPT = """
+local out = {}
+for i = 1, #KEYS, 2 do
+    local digest = redis.call('GET', KEYS[i])
+    if digest and redis.call('EXISTS', KEYS[i + 1]) == 0 then
+        digest = false
+    end
+    if digest then
+        out[#out + 1] = digest
+        out[#out + 1] = ''
+    else
+        out[#out + 1] = ''
+        out[#out + 1] = redis.call('GET', KEYS[i + 1]) or ''
+    end
+end
+return out
+"""
+# KEYS are (digest key, movie key) pairs and ARGV the matching (digest, movie) pairs. Each movie is
+# written unless the stored digest already matches and the movie exists, so a concurrent run that
+# already cached it is not overwritten. Returns 1 for each movie written and 0 for each one left as is.
+WRITE_MOVIES_SCRIPT = """
+local out = {}
+for i = 1, #KEYS, 2 do
+    if redis.call('GET', KEYS[i]) == ARGV[i] and redis.call('EXISTS', KEYS[i + 1]) == 1 then
+        out[#out + 1] = 0
+    else
+        redis.call('MSET', KEYS[i + 1], ARGV[i + 1], KEYS[i], ARGV[i])
+        out[#out + 1] = 1
+    end
+end
+return out
+"""
 # CACHE_TTL_SECONDS is no longer needed as cache is permanent
 
 # --- Data Constraints ---
 MAX_CONTENT_LENGTH = 1000 # Max length for movie content in cache before truncation
 REQUEST_TIMEOUT = 10 # Seconds for API requests
+MOVIE_TEXT_FIELDS = ("content", "name", "origin_name", "trailer_url") # Sanitized before caching
+EPISODE_TEXT_FIELDS = ("filename", "name")
+SMART_QUOTES_TABLE = str.maketrans({'“': '"', '”': '"', '‘': "'", '’': "'"})
+CONTROL_CHARS_PATTERN = re.compile(r"[\x00-\x1f\x7f-\x9f]") # The non-printable characters seen in practice
+MAX_CONCURRENT_REQUESTS = 8 # Max API requests in flight at once
+REQUESTS_PER_SECOND = 5 # Average API request rate allowed across all concurrent fetches
+PAGES_FETCHED_AHEAD = 2 # List pages prefetched while the current page is processed
+WRITE_BATCH_SIZE = 100 # Max movies written per Redis call by the background writer
+WRITE_QUEUE_SIZE = 1000 # Max movies waiting to be written before the crawl waits for the writer
+POOL_MAX_CONNECTIONS = 32 # Connection pool size shared by all requests (one is enough over HTTP/2)
+POOL_MAX_KEEPALIVE_CONNECTIONS = 16
+MAX_RETRIES = 2 # Retries for connection errors, timeouts and transient gateway errors
+RETRY_BACKOFF_FACTOR = 0.3 # Seconds; doubled after each retry
+RETRY_STATUSES = (502, 503, 504)
+# Connect/read failures and timeouts, like urllib3's Retry does for GETs
+RETRY_ERRORS = (httpx.NetworkError, httpx.RemoteProtocolError, httpx.TimeoutException)
+FETCH_ERRORS = (httpx.HTTPError, ValueError) # ValueError covers invalid JSON bodies
 
 # --- Validate Environment Variables ---
 if not UPSTASH_REDIS_REST_URL or not UPSTASH_REDIS_REST_TOKEN:
@@ -51,24 +116,111 @@ if not UPSTASH_REDIS_REST_URL or not UPSTASH_REDIS_REST_TOKEN:
 # --- Redis Initialization ---
 redis_client = Redis(url=UPSTASH_REDIS_REST_URL, token=UPSTASH_REDIS_REST_TOKEN)
 
-# --- Test Redis Connection ---
-try:
-    test_value = {"test": "value"}
-    redis_client.set("test_key", test_value, ex=60) 
-    
-    retrieved_raw_value = redis_client.get("test_key")
-    retrieved_value = json.loads(retrieved_raw_value) if isinstance(retrieved_raw_value, str) else retrieved_raw_value
-
-    if retrieved_value != test_value:
-        logger.error(f"Redis test failed: Expected {test_value}, got {retrieved_value}")
-        exit(1)
-    logger.info("Redis connection test successful.")
-    redis_client.delete("test_key") # Clean up test key
-except Exception as e:
-    logger.error(f"Redis connection failed: {e}")
-    exit(1)
+# --- API Response Schemas ---
+# Only the fields the crawler reads from the new movies list; everything else is skipped while decoding.
+class MovieListItem(msgspec.Struct):
+    slug: Optional[str] = None
+
+class Pagination(msgspec.Struct):
+    totalPages: int = 0
+
+class MovieListPage(msgspec.Struct):
+    status: bool = False
+    msg: Optional[str] = None
+    items: List[MovieListItem] = []
+    pagination: Pagination = msgspec.field(default_factory=Pagination)
+
+MOVIE_LIST_PAGE_DECODER = msgspec.json.Decoder(MovieListPage)
+
+# --- Rate Limiting ---
+class TokenBucket:
+    """Token bucket shared by all tasks, allowing `rate` requests per second with bursts up to `rate`."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Waits until a token is available and takes it."""
+        async with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self.tokens = 0
+                self.updated_at = time.monotonic()
+            else:
+                self.tokens -= 1
+
+rate_limiter = TokenBucket(REQUESTS_PER_SECOND)
+
+# --- Local Cache ---
+# Slug -> digest of every movie read or written during this run. Only the digests are kept, never
+# the movie data, so a page that repeats movies (the list shifts while crawling) costs no Redis reads.
+local_digest_cache: Dict[str, str] = {}
 
 # --- Helper Functions ---
+async def test_redis_connection() -> bool:
+    """Round-trips a test value through Redis. Returns False if the connection is unusable."""
+    try:
+        test_value = {"test": "value"}
+        await redis_client.set("test_key", test_value, ex=60) 
+        
+        retrieved_raw_value = await redis_client.get("test_key")
+        retrieved_value = orjson.loads(retrieved_raw_value) if isinstance(retrieved_raw_value, str) else retrieved_raw_value
+
+        if retrieved_value != test_value:
+            logger.error(f"Redis test failed: Expected {test_value}, got {retrieved_value}")
+            return False
+        logger.info("Redis connection test successful.")
+        await redis_client.delete("test_key") # Clean up test key
+    except Exception as e:
+        logger.error(f"Redis connection failed: {e}")
+        return False
+    return True
+
+def create_client() -> httpx.AsyncClient:
+    """
+    Creates the HTTP client shared by all API requests. Concurrent requests are multiplexed over a
+    single HTTP/2 connection when the server negotiates it, and use keep-alive HTTP/1.1 otherwise.
+    """
+    return httpx.AsyncClient(
+        http2=True,
+        headers={"User-Agent": USER_AGENT},
+        timeout=REQUEST_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=POOL_MAX_KEEPALIVE_CONNECTIONS
+        )
+    )
+
+async def fetch_json(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    url: str,
+    decode: Callable[[bytes], Any] = orjson.loads
+) -> Any:
+    """
+    GETs url and decodes its raw JSON body with decode, holding a semaphore slot for the duration of the request.
+    Every attempt takes a token from rate_limiter first.
+    RETRY_ERRORS and RETRY_STATUSES are retried up to MAX_RETRIES times with exponential backoff.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        await rate_limiter.acquire()
+        try:
+            async with semaphore:
+                response = await client.get(url)
+            if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                response.raise_for_status()
+                return decode(response.content)
+        except RETRY_ERRORS:
+            if attempt == MAX_RETRIES:
+                raise
+        await asyncio.sleep(RETRY_BACKOFF_FACTOR * 2 ** attempt)
+
 def validate_movie_data(movie: Dict[str, Any]) -> bool:
     """Validates essential fields for a movie object."""
     return bool(
@@ -78,73 +230,76 @@ def validate_movie_data(movie: Dict[str, Any]) -> bool:
         (movie.get("poster_url") or movie.get("thumb_url"))
     )
 
-def compare_objects(new_obj: Dict, old_obj: Dict) -> bool:
-    """Compares two Python dictionaries for equality, after converting to JSON and back."""
-    try:
-        new_normalized = json.dumps(new_obj, sort_keys=True, ensure_ascii=False)
-        old_normalized = json.dumps(old_obj, sort_keys=True, ensure_ascii=False)
-        return new_normalized == old_normalized
-    except (TypeError, json.JSONDecodeError) as e:
-        logger.error(f"Error comparing objects: {e}. New: {new_obj}, Old: {old_obj}")
-        return False
+def movie_cache_keys(slug: str) -> Tuple[str, str]:
+    """Returns the (digest key, movie key) pair of a slug."""
+    return f"{MOVIE_DIGEST_CACHE_PREFIX}{slug}", f"{MOVIE_DETAIL_CACHE_PREFIX}{slug}"
+
+def canonical_json(obj: Dict[str, Any]) -> bytes:
+    """Serializes obj to its canonical (key-sorted, compact) JSON form, which is what gets cached."""
+    return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+
+def compute_digest(canonical: bytes) -> str:
+    """Returns the hex BLAKE2b digest of a canonical JSON document."""
+    return hashlib.blake2b(canonical, digest_size=DIGEST_SIZE).hexdigest()
 
 def sanitize_string(s: Any) -> str:
     """Sanitizes strings to be printable and consistent."""
     if not isinstance(s, str):
         return str(s) if s is not None else ""
-    s = unicodedata.normalize('NFC', s)
-    s = s.replace('“', '"').replace('”', '"').replace('‘', "'").replace('’', "'")
+    s = unicodedata.normalize('NFC', s).translate(SMART_QUOTES_TABLE)
+    if s.isprintable():
+        return s
+    s = CONTROL_CHARS_PATTERN.sub("", s)
+    if s.isprintable():
+        return s
     return "".join(c for c in s if c.isprintable())
 
-def cache_movie(movie_item: Dict[str, Any]) -> str:
+async def cache_movie(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    movie_item: MovieListItem,
+    cached_digest: Optional[str]
+) -> Tuple[str, Optional[str], Optional[str]]:
     """
-    Fetches movie detail and caches it in Redis.
-    Returns "skipped" if unchanged, "cached" if updated/new, "failed" otherwise.
+    Fetches movie detail and compares its digest with cached_digest (the digest already read
+    for this movie by read_cached_digests).
+    Returns ("skipped", None, None) if unchanged, ("cached", canonical_json, digest) if updated/new
+    and canonical_json should be written, ("failed", None, None) otherwise.
     """
-    slug = movie_item.get("slug", "")
+    slug = movie_item.slug or ""
 
     if not slug:
         logger.warning(f"Invalid movie item (missing slug): {movie_item}")
-        return "failed"
-
-    cache_key = f"{MOVIE_DETAIL_CACHE_PREFIX}{slug}"
+        return "failed", None, None
 
     try:
-        response = requests.get(
-            f"{DETAIL_MOVIE_API_ENDPOINT}/{quote(slug)}",
-            headers={"User-Agent": USER_AGENT},
-            timeout=REQUEST_TIMEOUT
-        )
-        response.raise_for_status() 
-        api_data = response.json()
-        time.sleep(0.5) 
-    except requests.RequestException as e:
+        api_data = await fetch_json(client, semaphore, f"{DETAIL_MOVIE_API_ENDPOINT}/{quote(slug)}")
+    except FETCH_ERRORS as e:
         logger.error(f"Failed to fetch detail for {slug}: {e}")
-        return "failed"
+        return "failed", None, None
 
     if not api_data.get("status", False):
         logger.warning(f"API returned status false for {slug}: {api_data.get('msg')}")
-        return "failed"
+        return "failed", None, None
 
     movie_data = api_data.get("movie", {})
     episodes_data = api_data.get("episodes", [])
 
     if not validate_movie_data(movie_data):
         logger.warning(f"Invalid movie data from API for {slug}")
-        return "failed"
+        return "failed", None, None
 
-    for key in ["content", "name", "origin_name", "trailer_url"]:
+    for key in MOVIE_TEXT_FIELDS:
         if key in movie_data:
             movie_data[key] = sanitize_string(movie_data[key])
     if "content" in movie_data and len(movie_data["content"]) > MAX_CONTENT_LENGTH:
         movie_data["content"] = movie_data["content"][:MAX_CONTENT_LENGTH] + "..."
 
     for server in episodes_data:
-        for episode in server.get("server_data", []):
-            if "filename" in episode:
-                episode["filename"] = sanitize_string(episode["filename"])
-            if "name" in episode:
-                episode["name"] = sanitize_string(episode["name"])
+        for episode in server.get("server_data", ()):
+            for key in EPISODE_TEXT_FIELDS:
+                if key in episode:
+                    episode[key] = sanitize_string(episode[key])
 
     full_data_to_cache = {
         "status": api_data.get("status"),
@@ -153,78 +308,216 @@ def cache_movie(movie_item: Dict[str, Any]) -> str:
         "episodes": episodes_data
     }
 
-    try:
-        existing_raw_data = redis_client.get(cache_key)
-        existing_data = None
-        if isinstance(existing_raw_data, str):
+    # Serialized once: the same bytes are hashed and written to the cache
+    canonical = canonical_json(full_data_to_cache)
+    digest = compute_digest(canonical)
+    if digest == cached_digest:
+        logger.info(f"Skipped unchanged movie: {slug}")
+        return "skipped", None, None
+
+    return "cached", canonical.decode(), digest
+
+async def read_cached_digests(items: List[MovieListItem]) -> List[Optional[str]]:
+    """
+    Returns the cached digests for all items of a page, reading those not in local_digest_cache
+    with a single READ_DIGESTS_SCRIPT call. Movies cached before digests were stored are read in
+    full once, and their digest is backfilled.
+    """
+    slugs = [item.slug or "" for item in items]
+    unknown_slugs = [slug for slug in slugs if slug and slug not in local_digest_cache]
+    if unknown_slugs:
+        keys = []
+        for slug in unknown_slugs:
+            keys += movie_cache_keys(slug)
+        reply = await redis_client.eval(READ_DIGESTS_SCRIPT, keys=keys)
+
+        backfill = {}
+        for slug, digest, existing_raw_data in zip(unknown_slugs, reply[::2], reply[1::2]):
+            if digest:
+                local_digest_cache[slug] = digest
+                continue
+            if not existing_raw_data:
+                continue
             try:
-                existing_data = json.loads(existing_raw_data)
-            except json.JSONDecodeError:
+                local_digest_cache[slug] = compute_digest(canonical_json(orjson.loads(existing_raw_data)))
+            except orjson.JSONDecodeError:
                 logger.warning(f"Corrupted JSON in cache for {slug}. Fetching new data.")
-                existing_data = None
-
-        if existing_data and compare_objects(full_data_to_cache, existing_data):
-            logger.info(f"Skipped unchanged movie: {slug}")
-            return "skipped"
+                continue
+            backfill[movie_cache_keys(slug)[0]] = local_digest_cache[slug]
+        if backfill:
+            await redis_client.mset(backfill)
 
-        redis_client.set(cache_key, full_data_to_cache)
-        logger.info(f"Cached movie: {slug} (updated/new) - Permanent.")
+    return [local_digest_cache.get(slug) for slug in slugs]
 
+async def flush_cached_movies(written_movies: Dict[str, Tuple[str, str]]) -> None:
+    """
+    Writes the changed movies of a page, given as slug -> (canonical JSON, digest), together with their
+    digests with a single WRITE_MOVIES_SCRIPT call, which compares and sets in one atomic round-trip.
+    """
+    if not written_movies:
+        return
+    keys = []
+    args = []
+    for slug, (full_data_to_cache, digest) in written_movies.items():
+        keys += movie_cache_keys(slug)
+        args += [digest, full_data_to_cache]
+    try:
+        written = await redis_client.eval(WRITE_MOVIES_SCRIPT, keys=keys, args=args)
     except Exception as e:
-        logger.error(f"Error caching movie {slug}: {e}")
-        return "failed"
-
-    return "cached"
-
-def crawl_movies():
-    """Crawls new movies API and updates cache."""
-    page = 1
-    logger.info(f"Starting movie cache update at {datetime.utcnow().isoformat()}Z")
-
+        logger.error(f"Error caching movies {', '.join(written_movies)}: {e}")
+        # Không ghi được: quên digest đã ghi nhận lúc xếp hàng để lần gặp lại đọc lại từ Redis
+        for slug in written_movies:
+            local_digest_cache.pop(slug, None)
+        return
+    for slug, was_written in zip(written_movies, written):
+        if was_written:
+            logger.info(f"Cached movie: {slug} (updated/new) - Permanent.")
+        else:
+            logger.info(f"Movie already cached by another run: {slug}")
+
+async def write_cached_movies(write_queue: "asyncio.Queue[Optional[Tuple[str, str, str]]]") -> None:
+    """
+    Background writer: drains (slug, canonical JSON, digest) entries from write_queue and writes
+    whatever has accumulated, up to WRITE_BATCH_SIZE movies, with flush_cached_movies. Returns after
+    writing everything queued before a None entry.
+    """
     while True:
+        entry = await write_queue.get()
+        batch = {}
+        while entry is not None:
+            slug, full_data_to_cache, digest = entry
+            batch[slug] = (full_data_to_cache, digest)
+            if len(batch) >= WRITE_BATCH_SIZE or write_queue.empty():
+                break
+            entry = write_queue.get_nowait()
+        await flush_cached_movies(batch)
+        if entry is None:
+            return
+
+def fetch_page(client: httpx.AsyncClient, semaphore: asyncio.Semaphore, page: int) -> "asyncio.Task[MovieListPage]":
+    """Starts fetching a page of the new movies list in the background."""
+    return asyncio.create_task(fetch_json(
+        client, semaphore, f"{NEW_MOVIES_API_ENDPOINT}?page={page}&limit={LIMIT_PER_PAGE}",
+        decode=MOVIE_LIST_PAGE_DECODER.decode
+    ))
+
+async def crawl_movies(direction: str = "forward", stop_on_unchanged: Optional[bool] = None):
+    """
+    Crawls new movies API and updates cache.
+    "forward" starts from the most recently updated page, "backward" from the last page. With
+    stop_on_unchanged the crawl ends at the first movie that is already cached unchanged; it
+    defaults to True for forward and False for backward, whose oldest pages are mostly unchanged.
+    """
+    page = 1
+    step = 1 if direction == "forward" else -1
+    if stop_on_unchanged is None:
+        stop_on_unchanged = step > 0
+    logger.info(f"Starting movie cache update ({direction}) at {datetime.utcnow().isoformat()}Z")
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    # Việc ghi vào Redis chạy nền để không chặn việc tải trang tiếp theo
+    write_queue = asyncio.Queue(maxsize=WRITE_QUEUE_SIZE)
+    writer = asyncio.create_task(write_cached_movies(write_queue))
+    async with create_client() as client:
+        # Các trang tiếp theo được tải trước trong lúc xử lý trang hiện tại
+        page_tasks = {page: fetch_page(client, semaphore, page)}
         try:
-            logger.info(f"Fetching page {page} of new movies (limit: {LIMIT_PER_PAGE})...")
-            response = requests.get(
-                f"{NEW_MOVIES_API_ENDPOINT}?page={page}&limit={LIMIT_PER_PAGE}",
-                headers={"User-Agent": USER_AGENT},
-                timeout=REQUEST_TIMEOUT
-            )
-            response.raise_for_status()
-            api_data = response.json()
-        except requests.RequestException as e:
-            logger.error(f"Failed to fetch new movies page {page}: {e}")
-            break # Exit loop on request error
-
-        if not api_data.get("status", False):
-            logger.warning(f"API returned status false for page {page}: {api_data.get('msg')}")
-            break # Exit loop if API reports error
-
-        items = api_data.get("items", [])
-        total_pages = api_data.get("pagination", {}).get("totalPages", 0)
-
-        if not items:
-            logger.info(f"No more items on page {page}. Stopping.")
-            break # Exit loop if no items found
-
-        # --- ĐIỀU CHỈNH QUAN TRỌNG TẠI ĐÂY ---
-        for item in items:
-            result = cache_movie(item)
-            if result == "skipped":
-                logger.info(f"Encountered a skipped movie ({item.get('slug')}). Stopping script early.")
-                return # Dừng script ngay lập tức
-            
-            # Một độ trễ nhỏ giữa xử lý mỗi bộ phim để giảm tải cho API
-            time.sleep(0.1)
-
-        # Logic này không cần thiết nữa vì chúng ta đã dừng ngay lập tức
-        # if page >= total_pages:
-        #     logger.info(f"Reached last page ({total_pages}). Stopping.")
-        #     break
-
-        page += 1
-        time.sleep(1.0) # Độ trễ trước khi tìm nạp trang tiếp theo (nếu script chưa dừng)
+            if step < 0:
+                # Trang 1 cho biết tổng số trang, quét ngược bắt đầu từ trang cuối
+                try:
+                    api_data = await page_tasks.pop(page)
+                except FETCH_ERRORS as e:
+                    logger.error(f"Failed to fetch new movies page {page}: {e}")
+                    return
+
+                if not api_data.status:
+                    logger.warning(f"API returned status false for page {page}: {api_data.msg}")
+                    return
+                page = api_data.pagination.totalPages
+
+            while page >= 1:
+                try:
+                    logger.info(f"Fetching page {page} of new movies (limit: {LIMIT_PER_PAGE})...")
+                    api_data = await (page_tasks.pop(page, None) or fetch_page(client, semaphore, page))
+                except FETCH_ERRORS as e:
+                    logger.error(f"Failed to fetch new movies page {page}: {e}")
+                    break # Exit loop on request error
+
+                if not api_data.status:
+                    logger.warning(f"API returned status false for page {page}: {api_data.msg}")
+                    break # Exit loop if API reports error
+
+                items = api_data.items
+                total_pages = api_data.pagination.totalPages
+
+                if not items:
+                    logger.info(f"No more items on page {page}. Stopping.")
+                    break # Exit loop if no items found
+
+                for next_page in range(page + step, page + step * (PAGES_FETCHED_AHEAD + 1), step):
+                    if 1 <= next_page <= total_pages and next_page not in page_tasks:
+                        page_tasks[next_page] = fetch_page(client, semaphore, next_page)
+
+                try:
+                    cached_digests = await read_cached_digests(items)
+                except Exception as e:
+                    logger.error(f"Failed to read cache for page {page}: {e}")
+                    break # Exit loop on Redis error
+
+                # Chi tiết phim của cả trang được tải song song, giới hạn bởi semaphore
+                results = await asyncio.gather(*[
+                    cache_movie(client, semaphore, item, cached_digest)
+                    for item, cached_digest in zip(items, cached_digests)
+                ])
+
+                # --- ĐIỀU CHỈNH QUAN TRỌNG TẠI ĐÂY ---
+                for item, (result, full_data_to_cache, digest) in zip(items, results):
+                    if result == "cached":
+                        # Ghi nhận digest ngay khi xếp hàng để phim lặp lại ở trang sau được coi là không đổi
+                        local_digest_cache[item.slug] = digest
+                        await write_queue.put((item.slug, full_data_to_cache, digest))
+                    elif result == "skipped" and stop_on_unchanged:
+                        logger.info(f"Encountered a skipped movie ({item.slug}). Stopping script early.")
+                        return # Dừng script ngay lập tức
+
+                # Logic này không cần thiết nữa vì chúng ta đã dừng ngay lập tức
+                # if page >= total_pages:
+                #     logger.info(f"Reached last page ({total_pages}). Stopping.")
+                #     break
+
+                page += step
+        finally:
+            for task in page_tasks.values():
+                task.cancel()
+            # Chờ ghi xong mọi phim đã xếp hàng trước khi kết thúc
+            await write_queue.put(None)
+            await writer
 
     logger.info(f"Movie cache update completed at {datetime.utcnow().isoformat()}Z")
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Crawls new movies from phimapi.com into the Redis cache.")
+    parser.add_argument(
+        "--direction", choices=("forward", "backward"), default="forward",
+        help="forward starts from the newest page (default), backward from the oldest"
+    )
+    parser.add_argument(
+        "--no-stop-on-unchanged", dest="stop_on_unchanged", action="store_false", default=None,
+        help="keep crawling past movies that are already cached unchanged (always the case for backward)"
+    )
+    return parser.parse_args()
+
+async def main(args: argparse.Namespace):
+    if not await test_redis_connection():
+        exit(1)
+    try:
+        await crawl_movies(direction=args.direction, stop_on_unchanged=args.stop_on_unchanged)
+    finally:
+        await redis_client.close()
+
 if __name__ == "__main__":
-    crawl_movies()
+    args = parse_args()
+    if uvloop is not None:
+        uvloop.run(main(args))
+    else:
+        asyncio.run(main(args))